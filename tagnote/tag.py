@@ -117,6 +117,7 @@ from typing import (
 )
 from enum import Enum
 from filecmp import cmp
+from functools import lru_cache
 from textwrap import indent as textwrap_indent, fill as textwrap_fill
 
 
@@ -205,12 +206,18 @@ class Config:
         )
     )
 
-    def __init__(self, file: Optional[TextIO] = None) -> None:
+    def __init__(
+            self,
+            file: Optional[TextIO] = None,
+            values: Optional[Mapping[str, Any]] = None
+            ) -> None:
         """
         Create a Config instance, optionally parsing a config file, and make
         options available as fields.
 
         :param file: The file-like object for the configuration file, if any
+        :param values: Option values that have already been parsed, used
+                       instead of the file if given
         :raises TagError: For an error populating a configuration option
         """
         self.notes_directory = None  # type: Optional[Path]
@@ -219,9 +226,32 @@ class Config:
         self.rsync = None  # type: Optional[Sequence[str]]
         self.utc = None  # type: Optional[bool]
 
-        config_file = {}
-        if file:
-            config_file = load(file)
+        if values is None:
+            values = {}
+            if file:
+                values = load(file)
+        self._populate(values)
+
+    @classmethod
+    def from_dict(cls, values: Mapping[str, Any]) -> "Config":
+        """
+        Create a Config from options that have already been parsed, skipping
+        the JSON decoding of a config file.
+
+        :param values: The option values by name, as they would appear in the
+                       config file
+        :raises TagError: For an error populating a configuration option
+        :return: The Config
+        """
+        return cls(values=values)
+
+    def _populate(self, config_file: Mapping[str, Any]) -> None:
+        """
+        Set every option from the config file values or from its default
+
+        :param config_file: The option values from the config file by name
+        :raises TagError: For an error populating a configuration option
+        """
         for name, spec in self.PROPERTIES.items():
             default = spec.get("default")
             constructor = spec.get("constructor")
@@ -620,7 +650,7 @@ class Note(Tag):
 
         :return: The timestamp
         """
-        return parse_timestamp(Path(self.name).stem)
+        return note_timestamp(self.name)
 
 
 class Label(Tag):
@@ -683,11 +713,8 @@ class Label(Tag):
         self.check_exists()
         with self.path().open() as f:
             members = f.readlines()
-        return (
-            tag_of(member.strip(), self.directory)
-            for member in members
-            if tag_of(member.strip(), self.directory).check_exists()
-        )
+        tags = (tag_of(member.strip(), self.directory) for member in members)
+        return (tag for tag in tags if tag.check_exists())
 
     def search_text(self, pattern: Pattern) -> bool:
         """
@@ -949,6 +976,17 @@ def parse_timestamp(timestamp: str) -> datetime:
         ) from e
 
 
+@lru_cache(maxsize=4096)
+def note_timestamp(name: str) -> datetime:
+    """
+    Parse the timestamp out of a Note name, caching the result by name
+
+    :param name: The name of the Note
+    :return: The datetime
+    """
+    return parse_timestamp(Path(name).stem)
+
+
 def parse_backup_file(name: str) -> Tuple[str, str, str]:
     """
     Parse a backup file, e.g. for rsync transfers
@@ -2120,9 +2158,11 @@ def argument_parser() -> ArgumentParser:
     return parser
 
 
+@lru_cache(maxsize=256)
 def compile_regex(pattern: str) -> Pattern:
     """
-    Wrap regex compilation in a TagError if it fails
+    Wrap regex compilation in a TagError if it fails. Compiled patterns are
+    cached, so repeated filters on the same pattern share one Pattern.
 
     :param pattern: The string pattern to compile
     :return: The regex Pattern
@@ -2136,6 +2176,29 @@ def compile_regex(pattern: str) -> Pattern:
     return regex
 
 
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
+
+def name_matcher(pattern: str) -> Callable[[str], bool]:
+    """
+    Build a test for whether a regex is found in a name. A pattern that is
+    just literal text, optionally wrapped in ".*", is checked as a plain
+    substring instead of through the regex engine.
+
+    :param pattern: The string pattern
+    :return: A function from a name to whether the pattern is found in it
+    """
+    inner = pattern
+    if inner.startswith(".*"):
+        inner = inner[2:]
+    if inner.endswith(".*"):
+        inner = inner[:-2]
+    if REGEX_METACHARACTERS.isdisjoint(inner):
+        return lambda name: inner in name
+    regex = compile_regex(pattern)
+    return lambda name: regex.search(name) is not None
+
+
 def parse_type(type_: str) -> Type[Tag]:
     """
     Parse a Tag type passed as a string
@@ -2165,19 +2228,19 @@ def run_filters(results: Iterable[Tag], args: Namespace) -> Iterator[Tag]:
 
         def time(t: Tag) -> bool:
             if isinstance(t, Note):
+                timestamp = t.to_timestamp()
                 return any(
-                    pattern.match(t.to_timestamp())
-                    for pattern in time_patterns
+                    pattern.match(timestamp) for pattern in time_patterns
                 )
             return False
 
         filters.append(time)
 
     if args.name:
-        name_patterns = [compile_regex(name) for name in args.name]
+        name_matchers = [name_matcher(name) for name in args.name]
 
         def name(t: Tag) -> bool:
-            return all(pattern.search(t.name) for pattern in name_patterns)
+            return all(matches(t.name) for matches in name_matchers)
 
         filters.append(name)
 
@@ -2207,6 +2270,7 @@ def run_filters(results: Iterable[Tag], args: Namespace) -> Iterator[Tag]:
     return results
 
 
+@lru_cache(maxsize=64)
 def parse_order(value: str) -> Optional[bool]:
     """
     Parse a sort order passed as a string
@@ -2227,6 +2291,7 @@ def parse_order(value: str) -> Optional[bool]:
     )
 
 
+@lru_cache(maxsize=64)
 def parse_range(text: str) -> slice:
     """
     Parse a range passed as a string
@@ -2237,34 +2302,18 @@ def parse_range(text: str) -> slice:
     if not text.strip():
         raise TagError("Empty range", TagError.EXIT_BAD_RANGE)
     components = text.split(":")
-    if len(components) > 3 or len(components) < 1:
+    if len(components) > 3:
         raise TagError("Bad range: '{}'".format(text), TagError.EXIT_BAD_RANGE)
-
-    def try_int(value) -> int:
-        try:
-            return int(value)
-        except (ValueError, TypeError) as e:
-            raise TagError(
-                "Bad range: '{}'".format(text), TagError.EXIT_BAD_RANGE
-            ) from e
-
-    if components[0]:
-        start = try_int(components[0])
-    else:
-        start = 0
-    if len(components) == 1:
+    try:
+        values = [int(c) if c else None for c in components]
+    except ValueError as e:
+        raise TagError(
+            "Bad range: '{}'".format(text), TagError.EXIT_BAD_RANGE
+        ) from e
+    start = 0 if values[0] is None else values[0]
+    if len(values) == 1:
         return slice(start, start + 1)
-    if components[1]:
-        end = try_int(components[1])
-    else:
-        end = None
-    if len(components) == 2:
-        return slice(start, end)
-    if components[2]:
-        step = try_int(components[2])
-    else:
-        step = None
-    return slice(start, end, step)
+    return slice(start, *values[1:])
 
 
 def run_order_range(
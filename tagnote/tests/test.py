@@ -15,24 +15,166 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 from unittest import TestCase, main
-from unittest.mock import patch
 from io import StringIO
-from tempfile import TemporaryDirectory, NamedTemporaryFile
+import tempfile
+from tempfile import TemporaryDirectory, mkdtemp, mkstemp
 from datetime import datetime
 from pathlib import Path
 from re import compile as re_compile
-from typing import Sequence, TextIO
-from os import terminal_size, utime
-from json import dumps
-from argparse import Namespace
-
+from typing import (
+    Sequence, TextIO, Dict, Tuple, Iterable, Iterator, Any, Union, List,
+    Optional
+)
+from os import (
+    terminal_size, utime, open as os_open, close, O_WRONLY, O_CREAT,
+    O_CLOEXEC, environ, makedirs
+)
+from json import loads
+from argparse import ArgumentParser, Namespace
+from copy import copy, deepcopy
+from shutil import rmtree
+from collections import Counter
+from itertools import zip_longest
+from contextlib import contextmanager
+from operator import lt, le, gt, ge
+
+import tagnote.tag as tag_module
 from tagnote.tag import (
-    Note, Label, tag_of, TagError, Config, all_non_tags, all_tags, AllTagsFrom,
+    Tag, Note, Label, tag_of, TagError, Config, all_non_tags, all_tags,
+    AllTagsFrom,
     left_pad, format_timestamp, MultipleColumn, SingleColumn,
     tag_types, valid_tag_instance, valid_tag_name,
     argument_parser, Add, Import, parse_range, parse_order, run_order_range,
     split_timestamp, parse_timestamp, DatePattern, DateRange, run_filters,
-    parse_type, compile_regex, read_config_file, parse_backup_file, Reconcile)
+    parse_type, compile_regex, name_matcher, read_config_file,
+    parse_backup_file, Reconcile)
+
+
+# Config file contents for TestConfig, with the parsed form of those that can
+# skip the file
+CFG_JSON_INT_2 = '{"notes_directory": "2"}'
+CFG_JSON_INT_3 = '{"notes_directory": "3"}'
+CFG_JSON_NOT_INT = '{"notes_directory": "foo"}'
+CFG_INT_3 = loads(CFG_JSON_INT_3)
+CFG_NOT_INT = loads(CFG_JSON_NOT_INT)
+
+# The tempfile.tempdir in effect before setUpModule, restored afterwards
+_OLD_TEMPDIR = None  # type: Optional[str]
+
+
+def setUpModule() -> None:
+    """
+    Put temporary files under TAGNOTE_TEST_TMP when it is set, e.g. to a
+    tmpfs like /dev/shm/tagnote-tests so that test fixtures never touch the
+    disk
+    """
+    global _OLD_TEMPDIR
+    _OLD_TEMPDIR = tempfile.tempdir
+    if environ.get("TAGNOTE_TEST_TMP"):
+        makedirs(environ["TAGNOTE_TEST_TMP"], exist_ok=True)
+        tempfile.tempdir = environ["TAGNOTE_TEST_TMP"]
+
+
+def tearDownModule() -> None:
+    """
+    Restore the tempfile.tempdir that setUpModule replaced
+    """
+    tempfile.tempdir = _OLD_TEMPDIR
+
+
+# The program's argument parser, shared by every test. Parsing does not
+# mutate it, so one instance is safe to reuse.
+_PARSER = argument_parser()
+
+# Fixtures shared by tests that only read them
+_P_BAZ, _P_OWN, _P_BAR, _P_FOO = map(re_compile, ("baz", "own", "bar", "foo"))
+TS_2018_10_09 = datetime(2018, 10, 9, 8, 7, 6)
+_EMPTY = Path()
+NOTE_10_10_10 = Note("2018-10-10_10-10-10.txt", _EMPTY)
+
+# Parsed command lines keyed by argument vector, shared across tests
+_PARSED_ARGS_CACHE = {}  # type: Dict[Tuple[str, ...], Namespace]
+
+
+@contextmanager
+def swap_attr(obj: Any, name: str, value: Any) -> Iterator[Any]:
+    """
+    Temporarily replace an attribute without the machinery of mock.patch
+
+    :param obj: The object, class, or module owning the attribute
+    :param name: The name of the attribute
+    :param value: The replacement value
+    :return: The replacement value
+    """
+    # Inherited class attributes are deleted afterwards instead of restored,
+    # so the subclass doesn't end up with its own copy
+    had_own = name in vars(obj)
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield value
+    finally:
+        if had_own:
+            setattr(obj, name, old)
+        else:
+            delattr(obj, name)
+
+
+@contextmanager
+def tmp_path() -> Iterator[Path]:
+    """
+    Create a temporary directory for the duration of a with block
+
+    :return: The Path of the directory
+    """
+    with TemporaryDirectory() as directory:
+        yield Path(directory)
+
+
+def _refill(buffer: TextIO, text: str) -> TextIO:
+    """
+    Replace the contents of a buffer and rewind it for reading
+
+    :param buffer: The buffer to reuse
+    :param text: The new contents
+    :return: The buffer
+    """
+    buffer.seek(0)
+    buffer.truncate()
+    buffer.write(text)
+    buffer.seek(0)
+    return buffer
+
+
+def _touch(path: Path) -> None:
+    """
+    Create an empty file, skipping the stat and utime of Path.touch()
+
+    :param path: The path of the file
+    """
+    fd = os_open(str(path), O_WRONLY | O_CREAT | O_CLOEXEC, 0o644)
+    close(fd)
+
+
+def _touch_all(*tags: Tag) -> None:
+    """
+    Create empty files for Tags
+
+    :param tags: The Tags to create files for
+    """
+    for tag in tags:
+        _touch(tag.path())
+
+
+def _bulk_add(parent: Label, children: Iterable[Tag]) -> None:
+    """
+    Write all the members of a new Label at once instead of adding them one
+    at a time
+
+    :param parent: The Label, which should not have any members yet
+    :param children: The members to write
+    """
+    parent.write_members(sorted(children))
 
 
 class TestConfig(TestCase):
@@ -55,7 +197,7 @@ class TestConfig(TestCase):
 
     def test_required_property(self):
         p1 = dict(notes_directory=dict())
-        with patch.object(Config, "PROPERTIES", new=p1):
+        with swap_attr(Config, "PROPERTIES", p1):
             with self.assertRaises(TagError) as e:
                 Config()
             self.assertEqual(
@@ -65,72 +207,112 @@ class TestConfig(TestCase):
 
     def test_constructor(self):
         p1 = dict(notes_directory=dict(constructor=int, default="-1"))
-        with patch.object(Config, "PROPERTIES", new=p1):
+        with swap_attr(Config, "PROPERTIES", p1):
             c1 = Config()
             self.assertEqual(-1, c1.notes_directory)
 
-            override = StringIO('{"notes_directory": "2"}')  # type: TextIO
+            override = StringIO(CFG_JSON_INT_2)  # type: TextIO
             c2 = Config(override)
             self.assertEqual(2, c2.notes_directory)
 
         p2 = dict(notes_directory=dict(constructor=int))
-        with patch.object(Config, "PROPERTIES", new=p2):
-            bad = StringIO('{"notes_directory": "foo"}')  # type: TextIO
+        with swap_attr(Config, "PROPERTIES", p2):
             with self.assertRaises(TagError) as e:
-                Config(bad)
+                Config.from_dict(CFG_NOT_INT)
             self.assertEqual(
                 TagError.EXIT_CONFIG_CONSTRUCTOR_FAILED,
                 e.exception.exit_status
             )
-            good = StringIO('{"notes_directory": "3"}')  # type: TextIO
-            c3 = Config(good)
+            c3 = Config.from_dict(CFG_INT_3)
             self.assertEqual(3, c3.notes_directory)
 
     def test_check_value(self):
+        buffer = StringIO()  # type: TextIO
         p1 = dict(notes_directory=dict(check=bool, check_string="bar bar bar"))
-        with patch.object(Config, "PROPERTIES", new=p1):
-            f1 = StringIO('{"notes_directory": ""}')  # type: TextIO
+        with swap_attr(Config, "PROPERTIES", p1):
             with self.assertRaises(TagError) as e:
-                Config(f1)
+                Config(_refill(buffer, '{"notes_directory": ""}'))
             self.assertEqual(
                 TagError.EXIT_CONFIG_CHECK_FAILED, e.exception.exit_status
             )
             self.assertTrue(str(e.exception).endswith("bar bar bar."))
 
-            f2 = StringIO('{"notes_directory": "hi"}')  # type: TextIO
-            c1 = Config(f2)
+            c1 = Config(_refill(buffer, '{"notes_directory": "hi"}'))
             self.assertEqual("hi", c1.notes_directory)
         p2 = dict(notes_directory=dict(check=bool))
-        with patch.object(Config, "PROPERTIES", new=p2):
-            f3 = StringIO('{"notes_directory": ""}')
+        with swap_attr(Config, "PROPERTIES", p2):
             with self.assertRaises(TagError) as e:
-                Config(f3)
+                Config(_refill(buffer, '{"notes_directory": ""}'))
             self.assertEqual(
                 TagError.EXIT_CONFIG_CHECK_FAILED, e.exception.exit_status
             )
             self.assertTrue(str(e.exception).endswith("has an invalid value."))
 
+    def test_from_dict(self):
+        from json import dumps
+
+        with TemporaryDirectory() as tmp_dir:
+            self.assertEqual(
+                Config(StringIO(dumps({"notes_directory": tmp_dir}))),
+                Config.from_dict({"notes_directory": tmp_dir})
+            )
+        self.assertEqual(Config(), Config.from_dict({}))
+        only_notes_directory = dict(
+            notes_directory=Config.PROPERTIES["notes_directory"]
+        )
+        with swap_attr(Config, "PROPERTIES", only_notes_directory):
+            self.assertIsNone(Config.from_dict({}).editor)
+        with self.assertRaises(TagError) as e:
+            Config.from_dict({"utc": "yes"})
+        self.assertEqual(
+            TagError.EXIT_CONFIG_CHECK_FAILED, e.exception.exit_status
+        )
+
     def test_check_equality(self):
         self.assertEqual(Config(), Config())
-        with patch("tagnote.tag.which", new=lambda x: True):
+        with swap_attr(tag_module, "which", lambda x: True):
             self.assertEqual(
-                Config(StringIO('{"editor": "foo", "notes_directory": "/"}')),
-                Config(StringIO('{"notes_directory": "/", "editor": "foo"}'))
+                Config.from_dict({"editor": "foo", "notes_directory": "/"}),
+                Config.from_dict({"notes_directory": "/", "editor": "foo"})
             )
             self.assertNotEqual(
-                Config(StringIO('{"editor": "foo"}')),
-                Config(StringIO('{"editor": "bar"}'))
+                Config.from_dict({"editor": "foo"}),
+                Config.from_dict({"editor": "bar"})
             )
 
 
 class TestTag(TestCase):
+    _root = None  # type: Optional[TemporaryDirectory]
+    root_path = None  # type: Optional[Path]
+
+    @classmethod
+    def setUpClass(cls):
+        cls._root = TemporaryDirectory()
+        cls.root_path = Path(cls._root.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._root.cleanup()
+
+    def make_test_dir(self) -> Path:
+        """
+        Create a directory for this test under the directory shared by the
+        class
+
+        :return: The new directory
+        """
+        assert self.root_path is not None
+        tmp_dir = Path(self.root_path, self.id())
+        tmp_dir.mkdir()
+        return tmp_dir
+
     def test_tag_names(self):
         with self.assertRaises(TagError) as e:
             Note("2018-05-05_01-01-01", Path())
         self.assertEqual(TagError.EXIT_BAD_NAME, e.exception.exit_status)
         self.assertEqual(
             "2018-10-10_10-10-10.txt",
-            Note("2018-10-10_10-10-10.txt", Path()).name
+            NOTE_10_10_10.name
         )
         with self.assertRaises(TagError) as e:
             Label("todo.txt", Path())
@@ -143,166 +325,149 @@ class TestTag(TestCase):
     def test_tag_operators(self):
         class Interloper:
             name = "2018-10-10_10-10-10.txt"
-            directory = Path()
+            directory = _EMPTY
 
         interloper = Interloper()
 
-        self.assertEqual(
-            2,
-            len(
-                {
-                    Label("todo", Path()),
-                    Label("todo", Path()),
-                    Label("tod", Path())
-                }
-            )
-        )
+        todo_a = Label("todo", _EMPTY)
+        todo_b = Label("todo", _EMPTY)
+        tod = Label("tod", _EMPTY)
+        todo_slash = Label("todo", Path("/"))
+        todo_tmp = Label("todo", Path("/tmp"))
+        a_a, a_b = Label("a", _EMPTY), Label("a", _EMPTY)
+        b_a, b_b = Label("b", _EMPTY), Label("b", _EMPTY)
+        label_10 = Label("2018-10-10_10-10-10", _EMPTY)
+        note_09 = Note("2018-10-10_09-10-10.txt", _EMPTY)
+        note_11 = Note("2018-10-10_11-10-10.txt", _EMPTY)
+
+        with self.subTest("hash"):
+            self.assertEqual(2, len({todo_a, todo_b, tod}))
+
+        with self.subTest("equality"):
+            self.assertEqual(todo_a, todo_b)
+            self.assertNotEqual(todo_slash, todo_tmp)
+            self.assertNotEqual(todo_a, tod)
+            self.assertNotEqual(todo_a, "todo")
+            self.assertNotEqual(NOTE_10_10_10, interloper)
+
+        with self.subTest("ordering"):
+            self.assertLess(label_10, NOTE_10_10_10)
+            self.assertLessEqual(a_a, a_b)
+            self.assertGreater(b_a, a_a)
+            self.assertGreaterEqual(b_a, b_b)
+
+        for op, note in (
+                (lt, note_09), (le, NOTE_10_10_10),
+                (gt, note_11), (ge, NOTE_10_10_10)
+                ):
+            with self.subTest(op=op.__name__), self.assertRaises(TypeError):
+                op(note, interloper)
+
+    def test_create_and_search_text(self):
+        tmp_dir = self.make_test_dir()
 
+        note = Note("2018-10-10_10-10-10.txt", tmp_dir)
+        with self.assertRaises(TagError) as e:
+            note.create()
         self.assertEqual(
-            Label("todo", Path()), Label("todo", Path())
-        )
-        self.assertNotEqual(
-            Label("todo", Path("/")), Label("todo", Path("/tmp"))
-        )
-        self.assertNotEqual(
-            Label("todo", Path()), Label("tod", Path())
-        )
-        self.assertNotEqual(
-            Label("todo", Path()), "todo"
+            TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
         )
-        self.assertNotEqual(
-            Note("2018-10-10_10-10-10.txt", Path()),
-            interloper
-        )
-
-        self.assertLess(
-            Label("2018-10-10_10-10-10", Path()),
-            Note("2018-10-10_10-10-10.txt", Path())
+        with self.assertRaises(TagError) as e:
+            note.search_text(_P_BAZ)
+        self.assertEqual(
+            TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
         )
-        with self.assertRaises(TypeError):
-            __ = Note("2018-10-10_09-10-10.txt", Path()) < interloper
-
-        self.assertLessEqual(Label("a", Path()), Label("a", Path()))
-        with self.assertRaises(TypeError):
-            __ = Note("2018-10-10_10-10-10.txt", Path()) <= interloper
-
-        self.assertGreater(Label("b", Path()), Label("a", Path()))
-        with self.assertRaises(TypeError):
-            __ = Note("2018-10-10_11-10-10.txt", Path()) > interloper
-
-        self.assertGreaterEqual(Label("b", Path()), Label("b", Path()))
-        with self.assertRaises(TypeError):
-            __ = Note("2018-10-10_10-10-10.txt", Path()) >= interloper
-
-    def test_create_and_search_text(self):
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
 
-            note = Note("2018-10-10_10-10-10.txt", tmp_dir)
-            with self.assertRaises(TagError) as e:
-                note.create()
-            self.assertEqual(
-                TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
+        with note.path().open("w") as f:
+            f.writelines(
+                ["The quick brown fox jumped\n", "over the lazy dog\n"]
             )
-            with self.assertRaises(TagError) as e:
-                p0 = re_compile("baz")
-                note.search_text(p0)
-            self.assertEqual(
-                TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
-            )
-
-            with note.path().open("w") as f:
-                f.writelines(
-                    ["The quick brown fox jumped\n", "over the lazy dog\n"]
-                )
-            create = note.create()
-            self.assertFalse(create)
+        create = note.create()
+        self.assertFalse(create)
 
-            p1 = re_compile("own")
-            m1 = note.search_text(p1)
-            self.assertTrue(m1)
+        m1 = note.search_text(_P_OWN)
+        self.assertTrue(m1)
 
-            p2 = re_compile("bar")
-            m2 = note.search_text(p2)
-            self.assertFalse(m2)
+        m2 = note.search_text(_P_BAR)
+        self.assertFalse(m2)
 
-            p3 = re_compile("foo")
-            self.assertFalse(Label("todo", tmp_dir).search_text(p3))
+        self.assertFalse(Label("todo", tmp_dir).search_text(_P_FOO))
 
     def test_member_category(self):
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
+        tmp_dir = self.make_test_dir()
 
-            note = Note("2018-10-10_10-10-10.txt", tmp_dir)
-            with self.assertRaises(TagError) as e:
-                note.add_member(Label("todo", tmp_dir))
-            self.assertEqual(
-                TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
-            )
-            with self.assertRaises(TagError) as e:
-                note.remove_member(Label("todo", tmp_dir))
-            self.assertEqual(
-                TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
-            )
-            with self.assertRaises(TagError) as e:
-                note.members()
-            self.assertEqual(
-                TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
-            )
-            with self.assertRaises(TagError) as e:
-                note.categories()
-            self.assertEqual(
-                TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
-            )
-            note.path().touch()
-            self.assertEqual(0, len(list(note.members())))
-
-            root1, root2 = Label("todo", tmp_dir), Label("1", tmp_dir)
-            child1, child2, child3 = (
-                Label("todo1", tmp_dir),
-                Label("todo2", tmp_dir),
-                Label("todo3", tmp_dir)
-            )
-            r1c, r2c = root1.create(), root2.create()
-            c1c, c2c, c3c = child1.create(), child2.create(), child3.create()
-            self.assertEqual((True, True), (r1c, r2c))
-            self.assertEqual((True, True, True), (c1c, c2c, c3c))
-
-            r1c3a = root1.add_member(child3)
-            r1c1a = root1.add_member(child1)
-            r1c2a = root1.add_member(child2)
-            r2c1a = root2.add_member(child1)
-            r2c2a = root2.add_member(child2)
-            self.assertEqual(
-                (True, True, True, True, True),
-                (r1c1a, r1c2a, r1c3a, r2c1a, r2c2a)
-            )
-            self.assertEqual({child1, child2, child3}, set(root1.members()))
-            self.assertEqual({child1, child2}, set(root2.members()))
-            self.assertEqual({root1, root2}, set(child1.categories()))
-            self.assertEqual({root1, root2}, set(child2.categories()))
-            self.assertEqual({root1}, set(child3.categories()))
-
-            r1c1a2 = root1.add_member(child1)
-            r1c2a2 = root1.add_member(child2)
-            r1c3a2 = root1.add_member(child3)
-            self.assertEqual((False, False, False), (r1c1a2, r1c2a2, r1c3a2))
-
-            r1c2d = root1.remove_member(child2)
-            self.assertEqual(True, r1c2d)
-            self.assertEqual({child1, child3}, set(root1.members()))
-            self.assertEqual({root2}, set(child2.categories()))
-
-            r1c2d2 = root1.remove_member(child2)
-            self.assertEqual(False, r1c2d2)
-
-            fake_child1 = Label("foo", tmp_dir)
-            root1.add_member(fake_child1)
-            with self.assertRaises(TagError) as e:
-                list(root1.members())
-            self.assertEqual(
-                TagError.EXIT_LABEL_NOT_EXISTS, e.exception.exit_status
-            )
+        note = Note("2018-10-10_10-10-10.txt", tmp_dir)
+        with self.assertRaises(TagError) as e:
+            note.add_member(Label("todo", tmp_dir))
+        self.assertEqual(
+            TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
+        )
+        with self.assertRaises(TagError) as e:
+            note.remove_member(Label("todo", tmp_dir))
+        self.assertEqual(
+            TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
+        )
+        with self.assertRaises(TagError) as e:
+            note.members()
+        self.assertEqual(
+            TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
+        )
+        with self.assertRaises(TagError) as e:
+            note.categories()
+        self.assertEqual(
+            TagError.EXIT_NOTE_NOT_EXISTS, e.exception.exit_status
+        )
+        _touch_all(note)
+        self.assertEqual(0, len(list(note.members())))
+
+        root1, root2 = Label("todo", tmp_dir), Label("1", tmp_dir)
+        child1, child2, child3 = (
+            Label("todo1", tmp_dir),
+            Label("todo2", tmp_dir),
+            Label("todo3", tmp_dir)
+        )
+        r1c, r2c = root1.create(), root2.create()
+        c1c, c2c, c3c = child1.create(), child2.create(), child3.create()
+        self.assertEqual((True, True), (r1c, r2c))
+        self.assertEqual((True, True, True), (c1c, c2c, c3c))
+
+        r1c3a = root1.add_member(child3)
+        r1c1a = root1.add_member(child1)
+        r1c2a = root1.add_member(child2)
+        r2c1a = root2.add_member(child1)
+        r2c2a = root2.add_member(child2)
+        self.assertEqual(
+            (True, True, True, True, True),
+            (r1c1a, r1c2a, r1c3a, r2c1a, r2c2a)
+        )
+        m1, m2 = set(root1.members()), set(root2.members())
+        self.assertEqual({child1, child2, child3}, m1)
+        self.assertEqual({child1, child2}, m2)
+        self.assertEqual({root1, root2}, set(child1.categories()))
+        self.assertEqual({root1, root2}, set(child2.categories()))
+        self.assertEqual({root1}, set(child3.categories()))
+
+        r1c1a2 = root1.add_member(child1)
+        r1c2a2 = root1.add_member(child2)
+        r1c3a2 = root1.add_member(child3)
+        self.assertEqual((False, False, False), (r1c1a2, r1c2a2, r1c3a2))
+
+        r1c2d = root1.remove_member(child2)
+        self.assertEqual(True, r1c2d)
+        m1 = set(root1.members())
+        self.assertEqual({child1, child3}, m1)
+        self.assertEqual({root2}, set(child2.categories()))
+
+        r1c2d2 = root1.remove_member(child2)
+        self.assertEqual(False, r1c2d2)
+
+        fake_child1 = Label("foo", tmp_dir)
+        root1.add_member(fake_child1)
+        with self.assertRaises(TagError) as e:
+            list(root1.members())
+        self.assertEqual(
+            TagError.EXIT_LABEL_NOT_EXISTS, e.exception.exit_status
+        )
 
     def test_note_convert_timestamp(self):
         timestamp = datetime(2018, 11, 11, 10, 10, 10)
@@ -311,6 +476,7 @@ class TestTag(TestCase):
         self.assertEqual(Path("/tmp/foobar"), from_timestamp.directory)
         to_timestamp = from_timestamp.to_timestamp()
         self.assertEqual(timestamp, to_timestamp)
+        self.assertIs(to_timestamp, from_timestamp.to_timestamp())
 
     # noinspection PyTypeChecker
     def test_static_tag_helpers(self):
@@ -328,7 +494,7 @@ class TestTag(TestCase):
             raise TagError(
                 "arg I am dead", TagError.EXIT_UNSUPPORTED_OPERATION
             )
-        with patch.object(Note, "__init__", new=bad_constructor):
+        with swap_attr(Note, "__init__", bad_constructor):
             with self.assertRaises(TagError) as e:
                 tag_of("todo", Path())
             self.assertEqual(
@@ -347,144 +513,113 @@ class TestTag(TestCase):
         self.assertTrue(valid_tag_name("foo", Label))
         self.assertTrue(valid_tag_instance(Label("foo", Path())), Label)
         self.assertTrue(valid_tag_name("2018-10-10_10-10-10.txt", Note))
-        self.assertTrue(
-            valid_tag_instance(Note("2018-10-10_10-10-10.txt", Path()), Note)
-        )
+        self.assertTrue(valid_tag_instance(NOTE_10_10_10, Note))
         self.assertTrue(valid_tag_name("bar"))
         self.assertTrue(valid_tag_instance(Label("bar", Path())))
 
     def test_all_non_tags(self):
-        with TemporaryDirectory() as tmp_dir:
-            swap_file = Path(tmp_dir, ".swp")
-            with swap_file.open("w") as f:
-                f.write("")
-            backup_file = Path(tmp_dir, "test.2018-01-02_03-04-05.bak")
-            with backup_file.open("w") as f:
-                f.write("")
-            self.assertEqual(
-                {swap_file, backup_file},
-                set(all_non_tags(Path(tmp_dir)))
-            )
+        tmp_dir = self.make_test_dir()
+        swap_file = Path(tmp_dir, ".swp")
+        backup_file = Path(tmp_dir, "test.2018-01-02_03-04-05.bak")
+        _touch(swap_file)
+        _touch(backup_file)
+        self.assertEqual(
+            {swap_file, backup_file},
+            set(all_non_tags(tmp_dir))
+        )
         with self.assertRaises(TagError) as e:
-            all_non_tags(Path(tmp_dir))
+            all_non_tags(Path(self.root_path, "missing"))
         self.assertEqual(
             TagError.EXIT_DIRECTORY_NOT_FOUND, e.exception.exit_status
         )
 
     def test_all_tags(self):
         with self.assertRaises(TagError) as e:
-            with TemporaryDirectory() as tmp_dir:
-                tmp_dir = Path(tmp_dir)
-            all_tags(tmp_dir)
+            all_tags(Path(self.root_path, "missing"))
         self.assertEqual(
             TagError.EXIT_DIRECTORY_NOT_FOUND, e.exception.exit_status
         )
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
-            note1 = Note("2018-10-10_10-10-10.txt", tmp_dir)
-            note2 = Note("2018-10-10_10-10-11.txt", tmp_dir)
-            note3 = Note("2018-10-10_10-10-12.txt", tmp_dir)
-            label1 = Label("todo1", tmp_dir)
-            label2 = Label("todo2", tmp_dir)
-            label3 = Label("todo3", tmp_dir)
-            extra1 = Path(tmp_dir, "todo1.2018-10-10_10-10-10.bak")
-            extra2 = Path(
-                tmp_dir, "2018-10-10_10-10-10.txt.2018-10-10_10-10-11.bak"
-            )
-            extra3 = Path(tmp_dir, "todo3.2018-10-10_10-10-12.bak")
-            note1.path().touch(), note2.path().touch(), note3.path().touch()
-            label1.path().touch(), label2.path().touch(), label3.path().touch()
-            extra1.touch(), extra2.touch(), extra3.touch()
-
-            all_ = list(all_tags(tmp_dir))
-            all_.sort()
-            self.assertEqual(
-                [note1, note2, note3, label1, label2, label3],
-                all_
-            )
-
-            notes = list(all_tags(tmp_dir, Note))
-            notes.sort()
-            self.assertEqual([note1, note2, note3], notes)
-
-            labels = list(all_tags(tmp_dir, Label))
-            labels.sort()
-            self.assertEqual([label1, label2, label3], labels)
+        tmp_dir = self.make_test_dir()
+        note1 = Note("2018-10-10_10-10-10.txt", tmp_dir)
+        note2 = Note("2018-10-10_10-10-11.txt", tmp_dir)
+        note3 = Note("2018-10-10_10-10-12.txt", tmp_dir)
+        label1 = Label("todo1", tmp_dir)
+        label2 = Label("todo2", tmp_dir)
+        label3 = Label("todo3", tmp_dir)
+        extra1 = "todo1.2018-10-10_10-10-10.bak"
+        extra2 = "2018-10-10_10-10-10.txt.2018-10-10_10-10-11.bak"
+        extra3 = "todo3.2018-10-10_10-10-12.bak"
+        _touch_all(note1, note2, note3, label1, label2, label3)
+        for name in (extra1, extra2, extra3):
+            _touch(Path(tmp_dir, name))
+
+        self.assertCountEqual(
+            [note1, note2, note3, label1, label2, label3],
+            all_tags(tmp_dir)
+        )
+        self.assertCountEqual(
+            [note1, note2, note3], all_tags(tmp_dir, Note)
+        )
+        self.assertCountEqual(
+            [label1, label2, label3], all_tags(tmp_dir, Label)
+        )
 
     def test_all_tags_from(self):
         """
         Notes nested under labels should still be returned when only returning
         notes, and throw in a multi-node loop for good measure.
         """
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
-
-            note1 = Note("2018-10-10_09-09-09.txt", tmp_dir)
-            note1.path().touch()
-            self.assertEqual([note1], list(AllTagsFrom([note1])))
-
-            label1 = Label("foo", tmp_dir)
-            label1.create()
-            self.assertEqual([label1], list(AllTagsFrom([label1])))
-
-            node_1_1 = Label("all", tmp_dir)
-            node_2_1 = Label("work", tmp_dir)
-            node_2_2 = Label("play", tmp_dir)
-            node_2_3 = Note("2018-10-10_10-10-10.txt", tmp_dir)
-            node_3_1 = Note("2018-10-10_10-10-11.txt", tmp_dir)
-            node_3_2 = Label("work2", tmp_dir)
-            node_3_3 = Label("work3", tmp_dir)
-            node_4_1 = Note("2018-10-10_10-10-12.txt", tmp_dir)
-            node_loop_1 = Label("loop1", tmp_dir)
-            node_loop_2 = Label("loop2", tmp_dir)
-            node_loop_3 = Label("loop3", tmp_dir)
-            node_1_1.create()
-            node_2_1.create(), node_2_2.create(), node_2_3.path().touch()
-            node_3_1.path().touch(), node_3_2.create(), node_3_3.create()
-            node_4_1.path().touch()
-            node_loop_1.create(), node_loop_2.create(), node_loop_3.create()
-            node_1_1.add_member(node_2_1)
-            node_1_1.add_member(node_2_2)
-            node_1_1.add_member(node_2_3)
-            node_2_1.add_member(node_3_1)
-            node_2_1.add_member(node_3_2)
-            node_2_1.add_member(node_3_3)
-            node_3_2.add_member(node_4_1)
-            node_3_3.add_member(node_loop_1)
-            node_loop_1.add_member(node_loop_2)
-            node_loop_2.add_member(node_loop_3)
-            node_loop_3.add_member(node_1_1)
-
-            all_ = list(AllTagsFrom([node_1_1]))
-            all_.sort()
-            self.assertEqual(
-                [
-                    node_2_3, node_3_1, node_4_1,
-                    node_1_1,
-                    node_loop_1, node_loop_2, node_loop_3,
-                    node_2_2,
-                    node_2_1,
-                    node_3_2, node_3_3,
-                ],
-                all_
-            )
-
-            notes = list(AllTagsFrom([node_1_1], Note))
-            notes.sort()
-            self.assertEqual([node_2_3, node_3_1, node_4_1], notes)
-
-            labels = list(AllTagsFrom([node_1_1], Label))
-            labels.sort()
-            self.assertEqual(
-                [
-                    node_1_1,
-                    node_loop_1, node_loop_2, node_loop_3,
-                    node_2_2,
-                    node_2_1,
-                    node_3_2, node_3_3,
-                ],
-                labels
-            )
+        tmp_dir = self.make_test_dir()
+
+        note1 = Note("2018-10-10_09-09-09.txt", tmp_dir)
+        _touch_all(note1)
+        self.assertEqual([note1], list(AllTagsFrom([note1])))
+
+        label1 = Label("foo", tmp_dir)
+        label1.create()
+        self.assertEqual([label1], list(AllTagsFrom([label1])))
+
+        node_1_1 = Label("all", tmp_dir)
+        node_2_1 = Label("work", tmp_dir)
+        node_2_2 = Label("play", tmp_dir)
+        node_2_3 = Note("2018-10-10_10-10-10.txt", tmp_dir)
+        node_3_1 = Note("2018-10-10_10-10-11.txt", tmp_dir)
+        node_3_2 = Label("work2", tmp_dir)
+        node_3_3 = Label("work3", tmp_dir)
+        node_4_1 = Note("2018-10-10_10-10-12.txt", tmp_dir)
+        node_loop_1 = Label("loop1", tmp_dir)
+        node_loop_2 = Label("loop2", tmp_dir)
+        node_loop_3 = Label("loop3", tmp_dir)
+        for label in (
+                node_1_1, node_2_1, node_2_2, node_3_2, node_3_3,
+                node_loop_1, node_loop_2, node_loop_3
+                ):
+            label.create()
+        _touch_all(node_2_3, node_3_1, node_4_1)
+
+        _bulk_add(node_1_1, (node_2_1, node_2_2, node_2_3))
+        _bulk_add(node_2_1, (node_3_1, node_3_2, node_3_3))
+        _bulk_add(node_3_2, (node_4_1,))
+        _bulk_add(node_3_3, (node_loop_1,))
+        _bulk_add(node_loop_1, (node_loop_2,))
+        _bulk_add(node_loop_2, (node_loop_3,))
+        _bulk_add(node_loop_3, (node_1_1,))
+
+        expected = [
+            node_2_3, node_3_1, node_4_1,
+            node_1_1,
+            node_loop_1, node_loop_2, node_loop_3,
+            node_2_2,
+            node_2_1,
+            node_3_2, node_3_3,
+        ]
+        self.assertEqual(Counter(expected), Counter(AllTagsFrom([node_1_1])))
+        for tag_type in (Note, Label):
+            with self.subTest(tag_type=tag_type.__name__):
+                self.assertEqual(
+                    Counter(t for t in expected if isinstance(t, tag_type)),
+                    Counter(AllTagsFrom([node_1_1], tag_type))
+                )
 
 
 class TestFormat(TestCase):
@@ -501,32 +636,21 @@ class TestFormat(TestCase):
         )
 
     def test_format_timestamp(self):
-        t1 = datetime(
-            year=2018,
-            month=10,
-            day=9,
-            hour=8,
-            minute=7,
-            second=6
+        self.assertEqual(
+            "2018-10-09_08-07-06", format_timestamp(TS_2018_10_09)
         )
-        self.assertEqual("2018-10-09_08-07-06", format_timestamp(t1))
 
     def test_split_timestamp(self):
-        with self.assertRaises(TagError) as e:
-            split_timestamp("")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            split_timestamp("--")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            split_timestamp("__")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            split_timestamp("a-b-c_d-e-f-g")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
+        for bad in (
+                "", "--", "__", "a-b-c_d-e-f-g",
+                "a_good_show", "so-I_think", "so_you-think-you"
+                ):
+            with self.subTest(timestamp=bad):
+                with self.assertRaises(TagError) as e:
+                    split_timestamp(bad)
+                self.assertEqual(
+                    TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status
+                )
 
         full = split_timestamp("2018-09-10_a-b-c")
         self.assertEqual(
@@ -554,18 +678,6 @@ class TestFormat(TestCase):
             longer_partial_no_numbers
         )
 
-        with self.assertRaises(TagError) as e:
-            split_timestamp("a_good_show")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            split_timestamp("so-I_think")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            split_timestamp("so_you-think-you")
-        self.assertEqual(TagError.EXIT_BAD_TIMESTAMP, e.exception.exit_status)
-
     def test_parse_timestamp(self):
         full = parse_timestamp("2018-05-06_07-08-09")
         self.assertEqual(
@@ -615,50 +727,59 @@ class TestFormat(TestCase):
         self.assertEqual(TagError.EXIT_BAD_NAME, e.exception.exit_status)
 
     def test_multicolumn_null(self):
-        stdout = StringIO()
-        with patch("tagnote.tag.stdout", new=stdout):
+        with swap_attr(tag_module, "stdout", StringIO()) as stdout:
             MultipleColumn.format([])
-            self.assertEqual("", stdout.getvalue())
+        self.assertEqual("", stdout.getvalue())
 
     def test_multicolumn_common(self):
         def get_terminal_size():
             return terminal_size([10, 10])
-        stdout = StringIO()
-        with patch("tagnote.tag.get_terminal_size", new=get_terminal_size):
-            with patch("tagnote.tag.stdout", new=stdout):
-                with patch("tagnote.tag.MultipleColumn.PADDING", new=1):
-                    MultipleColumn.format(["1", "10", "110", "111", "112"])
-                    self.assertEqual(
-                        "1   111\n"
-                        "10  112\n"
-                        "110\n",
-                        stdout.getvalue()
-                    )
+        with swap_attr(tag_module, "get_terminal_size", get_terminal_size), \
+                swap_attr(MultipleColumn, "PADDING", 1), \
+                swap_attr(tag_module, "stdout", StringIO()) as stdout:
+            MultipleColumn.format(["1", "10", "110", "111", "112"])
+        self.assertEqual(
+            "1   111\n"
+            "10  112\n"
+            "110\n",
+            stdout.getvalue()
+        )
 
     def test_multicolumn_overflow(self):
         def get_terminal_size():
             return terminal_size([1, 1])
-        stdout = StringIO()
-        with patch("tagnote.tag.get_terminal_size", new=get_terminal_size):
-            with patch("tagnote.tag.stdout", new=stdout):
-                with patch("tagnote.tag.MultipleColumn.PADDING", new=1):
-                    MultipleColumn.format(["hello", "1"])
-                    self.assertEqual(
-                        "hello\n1\n",
-                        stdout.getvalue()
-                    )
+        with swap_attr(tag_module, "get_terminal_size", get_terminal_size), \
+                swap_attr(MultipleColumn, "PADDING", 1), \
+                swap_attr(tag_module, "stdout", StringIO()) as stdout:
+            MultipleColumn.format(["hello", "1"])
+        self.assertEqual(
+            "hello\n1\n",
+            stdout.getvalue()
+        )
 
     def test_single_column(self):
-        stdout = StringIO()
-        with patch("tagnote.tag.stdout", new=stdout):
+        with swap_attr(tag_module, "stdout", StringIO()) as stdout:
             SingleColumn.format(["single", "column", "format"])
-            self.assertEqual(
-                "single\ncolumn\nformat\n",
-                stdout.getvalue()
-            )
+        self.assertEqual(
+            "single\ncolumn\nformat\n",
+            stdout.getvalue()
+        )
 
 
 class TestDatePatternRange(TestCase):
+    # What DatePattern.from_string("2018-*-10_09-10") compares true against
+    _COMPARISONS = [
+        (lt, DatePattern(2019, None, None, 8, None, None)),
+        (le, DatePattern(2018, 9, 10, 11)),
+        (ge, DatePattern()),
+        (lt, DatePattern()),
+        (gt, DatePattern(None, None, None, None, 9)),
+        (le, datetime(2018, 10, 11)),
+        (ge, datetime(2018, 10, 10, 9, 9)),
+        (lt, datetime(2018, 10, 10, 9, 10, 11)),
+        (gt, datetime(2018, 10, 10, 9, 10, 11))
+    ]  # type: List[Tuple[Any, Union[DatePattern, datetime]]]
+
     def test_date_pattern(self):
         with self.assertRaises(TagError) as e:
             DatePattern(2018, 10, 10, 10, 10, 10, 10)
@@ -700,29 +821,15 @@ class TestDatePatternRange(TestCase):
             pattern
         )
 
-        self.assertLess(pattern, DatePattern(2019, None, None, 8, None, None))
-
-        self.assertLessEqual(pattern, DatePattern(2018, 9, 10, 11))
-
-        self.assertGreaterEqual(pattern, DatePattern())
-
-        self.assertLess(pattern, DatePattern())
-
-        self.assertGreater(pattern, DatePattern(None, None, None, None, 9))
-
-        self.assertLessEqual(pattern, datetime(2018, 10, 11))
-
-        self.assertGreaterEqual(pattern, datetime(2018, 10, 10, 9, 9))
+        for op, other in self._COMPARISONS:
+            with self.subTest(op=op.__name__, other=other):
+                self.assertTrue(op(pattern, other))
 
-        d1 = datetime(2018, 10, 10, 9, 10, 11)
-        self.assertLess(pattern, d1)
-        self.assertGreater(pattern, d1)
-
-        with self.assertRaises(TypeError):
-            __ = pattern < 1
-
-        with self.assertRaises(TypeError):
-            __ = pattern >= "pie"
+        for op in (lt, le, gt, ge):
+            for other in (1, "pie"):
+                with self.subTest(op=op.__name__, other=other), \
+                        self.assertRaises(TypeError):
+                    op(pattern, other)
 
     def test_date_range(self):
         with self.assertRaises(TagError) as e:
@@ -754,40 +861,50 @@ class TestDatePatternRange(TestCase):
 
 
 class TestCommand(TestCase):
+    parser = None  # type: Optional[ArgumentParser]
+    _template_config = None  # type: Optional[Config]
+    _template_config_utc = None  # type: Optional[Config]
+    _root = None  # type: Optional[TemporaryDirectory]
+
     @classmethod
     def setUpClass(cls):
-        cls.parser = argument_parser()
+        cls.parser = _PARSER
+        cls._template_config = Config.from_dict({"utc": False})
+        cls._template_config_utc = Config.from_dict({"utc": True})
+        cls._root = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._root.cleanup()
 
     def setUp(self):
-        self.notes_directory = TemporaryDirectory()
-        self.config = Config(
-            StringIO(
-                dumps(
-                    {
-                        "notes_directory": self.notes_directory.name,
-                        "utc": False
-                    }
-                )
-            )
-        )
-        self.config_utc = Config(
-            StringIO(
-                dumps(
-                    {
-                        "notes_directory": self.notes_directory.name,
-                        "utc": True
-                    }
-                )
-            )
-        )
+        self.notes_directory = Path(mkdtemp(dir=self._root.name))
+        self.config = copy(self._template_config)
+        self.config.notes_directory = self.notes_directory
+        self.config_utc = copy(self._template_config_utc)
+        self.config_utc.notes_directory = self.notes_directory
 
     def tearDown(self):
-        self.notes_directory.cleanup()
+        rmtree(str(self.notes_directory))
+
+    def parsed(self, *argv: str) -> Namespace:
+        """
+        Parse a command line, reusing the result of any earlier parse of the
+        same arguments
+
+        :param argv: The command-line arguments
+        :return: A deep copy of the parsed arguments, so list values are not
+                 shared between tests
+        """
+        assert self.parser is not None
+        if argv not in _PARSED_ARGS_CACHE:
+            _PARSED_ARGS_CACHE[argv] = self.parser.parse_args(list(argv))
+        return deepcopy(_PARSED_ARGS_CACHE[argv])
 
     def test_add(self):
         note_name = "2018-10-06_22-15-53.txt"
 
-        args = self.parser.parse_args(["add", note_name])
+        args = self.parsed("add", note_name)
         with self.assertRaises(TagError) as e:
             Add.run(args, self.config)
         self.assertEqual(
@@ -795,118 +912,94 @@ class TestCommand(TestCase):
             e.exception.exit_status
         )
 
-        note_path = Path(self.config.notes_directory, note_name)
-        with open(str(note_path), "w") as f:
-            f.write("")
-
-        args = self.parser.parse_args(["add", "base"])
-        results = Add.run(args, self.config)
-        results = list(results)
-        self.assertEqual(
-            [Label("base", self.config.notes_directory)], results
-        )
-        self.assertTrue(results[0].exists())
-
-        args = self.parser.parse_args(["add", note_name, "base"])
-        results = Add.run(args, self.config)
-        results = list(results)
-        self.assertEqual(0, len(results))
+        _touch(Path(self.notes_directory, note_name))
+
+        # Each step runs against the state the previous steps left behind,
+        # so the first failing step ends the test. Expect either the names
+        # of the new Labels or an exit status.
+        def run_steps(
+                steps: Iterable[Tuple[Tuple[str, ...], Union[int, List[str]]]]
+                ) -> None:
+            for argv, expected in steps:
+                msg = " ".join(argv)
+                args = self.parsed(*argv)
+                if isinstance(expected, int):
+                    with self.assertRaises(TagError, msg=msg) as e:
+                        Add.run(args, self.config)
+                    self.assertEqual(expected, e.exception.exit_status, msg)
+                else:
+                    results = list(Add.run(args, self.config))
+                    self.assertEqual(
+                        [
+                            Label(name, self.notes_directory)
+                            for name in expected
+                        ],
+                        results,
+                        msg
+                    )
+                    for result in results:
+                        self.assertTrue(result.exists(), msg)
+
+        run_steps([
+            (("add", "base"), ["base"]),
+            (("add", note_name, "base"), []),
+            (
+                ("add", note_name, "2019-01-01_01-01-01.txt"),
+                TagError.EXIT_UNSUPPORTED_OPERATION
+            ),
+            (
+                ("add", note_name, note_name),
+                TagError.EXIT_UNSUPPORTED_OPERATION
+            ),
+            (("add", "-p", note_name, "note_replica"), ["note_replica"])
+        ])
 
-        args = self.parser.parse_args(
-            ["add", note_name, "2019-01-01_01-01-01.txt"]
-        )
-        with self.assertRaises(TagError) as e:
-            Add.run(args, self.config)
         self.assertEqual(
-            TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
+            [Label("base", self.notes_directory)],
+            list(Label("note_replica", self.notes_directory).categories())
         )
 
-        args = self.parser.parse_args(["add", note_name, note_name])
-        with self.assertRaises(TagError) as e:
-            Add.run(args, self.config)
-        self.assertEqual(
-            TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
-        )
+        run_steps([
+            (
+                ("add", "-p", "baloney", note_name),
+                TagError.EXIT_LABEL_NOT_EXISTS
+            ),
+            (("add", "base", "base"), TagError.EXIT_UNSUPPORTED_OPERATION),
+            (("add", "base", "todo"), ["todo"]),
+            (("add", "foo", "base"), ["foo"]),
+            (
+                ("add", "base", "life", "todo", "todo", "todo", "bar"),
+                ["life", "bar"]
+            )
+        ])
 
-        args = self.parser.parse_args(["add", "-p", note_name, "note_replica"])
-        results = Add.run(args, self.config)
-        results = list(results)
-        self.assertEqual(
-            [Label("note_replica", self.config.notes_directory)], results
-        )
-        self.assertTrue(results[0].exists())
+    def test_import(self):
+        # The descriptor is closed straight away; only the file's mtime is
+        # read
+        fd, tmp_name = mkstemp(dir=str(self.notes_directory))
+        close(fd)
+        # 2018-10-06_20-17-30
+        seconds = 1538857050
+        utime(tmp_name, times=(seconds, seconds))
+
+        args = self.parsed("import", tmp_name)
+        results = Import.run(args, self.config_utc)
+        imported = next(results)
+        self.assertRaises(StopIteration, next, results)
+        self.assertTrue(imported.exists())
         self.assertEqual(
-            [Label("base", self.config.notes_directory)],
-            list(results[0].categories())
+            "2018-10-06_20-17-30.txt",
+            imported.name
         )
 
-        args = self.parser.parse_args(["add", "-p", "baloney", note_name])
-        with self.assertRaises(TagError) as e:
-            Add.run(args, self.config)
-        self.assertEqual(TagError.EXIT_LABEL_NOT_EXISTS, e.exception.exit_status)
-
-        args = self.parser.parse_args(["add", "base", "base"])
         with self.assertRaises(TagError) as e:
-            Add.run(args, self.config)
-        self.assertEqual(
-            TagError.EXIT_UNSUPPORTED_OPERATION, e.exception.exit_status
-        )
-
-        args = self.parser.parse_args(["add", "base", "todo"])
-        results = Add.run(args, self.config)
-        results = list(results)
-        self.assertEqual(
-            [Label("todo", self.config.notes_directory)], results
-        )
-        self.assertTrue(results[0].exists())
-
-        args = self.parser.parse_args(["add", "foo", "base"])
-        results = Add.run(args, self.config)
-        results = list(results)
-        self.assertEqual(
-            [Label("foo", self.config.notes_directory)], results
-        )
-        self.assertTrue(results[0].exists())
-
-        args = self.parser.parse_args(
-            ["add", "base", "life", "todo", "todo", "todo", "bar"]
-        )
-        results = Add.run(args, self.config)
-        results = list(results)
+            Import.run(args, self.config_utc)
         self.assertEqual(
-            [
-                Label("life", self.config.notes_directory),
-                Label("bar", self.config.notes_directory)
-            ],
-            results
+            TagError.EXIT_NOTE_EXISTS,
+            e.exception.exit_status
         )
-        self.assertTrue(results[0].exists())
-        self.assertTrue(results[1].exists())
-
-    def test_import(self):
-        with NamedTemporaryFile(dir=self.notes_directory.name) as tmp_file:
-            # 2018-10-06_20-17-30
-            seconds = 1538857050
-            utime(tmp_file.name, times=(seconds, seconds))
-
-            args = self.parser.parse_args(["import", tmp_file.name])
-            results = Import.run(args, self.config_utc)
-            results = list(results)
-            self.assertEqual(1, len(results))
-            self.assertTrue(results[0].exists())
-            self.assertEqual(
-                "2018-10-06_20-17-30.txt",
-                results[0].name
-            )
-
-            with self.assertRaises(TagError) as e:
-                Import.run(args, self.config_utc)
-            self.assertEqual(
-                TagError.EXIT_NOTE_EXISTS,
-                e.exception.exit_status
-            )
 
-        args = self.parser.parse_args(["import", tmp_file.name])
+        Path(tmp_name).unlink()
         with self.assertRaises(TagError) as e:
             Import.run(args, self.config_utc)
         self.assertEqual(
@@ -914,8 +1007,7 @@ class TestCommand(TestCase):
         )
 
     def test_reconcile_backup_files_by_tag(self):
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
+        with tmp_path() as tmp_dir:
             files = [
                 ".foo.swp",
                 "bar",
@@ -928,8 +1020,7 @@ class TestCommand(TestCase):
                 "zaire.2018-04-04_04-04-04.bak"
             ]
             for file in files:
-                with Path(tmp_dir, file).open("w") as f:
-                    f.write("")
+                _touch(Path(tmp_dir, file))
             Label("bar", tmp_dir).add_member(
                 Label("rab", tmp_dir)
             )
@@ -1024,12 +1115,48 @@ class TestCommand(TestCase):
 
 
 class TestPostProcessors(TestCase):
+    def assertIterEqual(self, expected: Iterable, actual: Iterable) -> None:
+        """
+        Compare two iterables element by element, stopping at the first
+        difference
+
+        :param expected: The expected elements, in order
+        :param actual: The actual elements, in order
+        """
+        missing = object()
+        pairs = zip_longest(expected, actual, fillvalue=missing)
+        for i, (e, a) in enumerate(pairs):
+            self.assertEqual(e, a, "Mismatch at index {}".format(i))
+
     def test_compile_regex(self):
         self.assertEqual(re_compile("."), compile_regex("."))
+        compile_regex.cache_clear()
+        first = compile_regex(".")
+        hits = compile_regex.cache_info().hits
+        self.assertIs(first, compile_regex("."))
+        self.assertEqual(hits + 1, compile_regex.cache_info().hits)
         with self.assertRaises(TagError) as e:
             compile_regex("???")
         self.assertEqual(TagError.EXIT_BAD_REGEX, e.exception.exit_status)
 
+    def test_name_matcher(self):
+        for pattern, name, expected in (
+                (".*not.*", "another", True),
+                ("not", "another", True),
+                ("not.*", "nothing", True),
+                (".*", "", True),
+                ("tnot", "another", False),
+                ("^t.s", "test", True),
+                ("^t.s", "a test", False),
+                ("\\.txt", "note.txt", True),
+                ("\\.txt", "notextra", False)
+                ):
+            with self.subTest(pattern=pattern, name=name):
+                self.assertEqual(expected, name_matcher(pattern)(name))
+        with self.assertRaises(TagError) as e:
+            name_matcher("???")
+        self.assertEqual(TagError.EXIT_BAD_REGEX, e.exception.exit_status)
+
     def test_parse_type(self):
         self.assertEqual(Note, parse_type("n"))
         self.assertEqual(Label, parse_type("l"))
@@ -1042,16 +1169,13 @@ class TestPostProcessors(TestCase):
         self.assertEqual(TagError.EXIT_BAD_TAG_TYPE, e.exception.exit_status)
 
     def test_filters(self):
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
+        with tmp_path() as tmp_dir:
             tags = []
             note = Note("2018-10-11_15-16-17.txt", tmp_dir)
-            with note.path().open("w") as f:
-                f.writelines(["The text to match", "is here", "on this line"])
+            note.path().write_text("The text to matchis hereon this line")
             note.create()
             extra_note = Note("2019-04-04_02-03-04.txt", tmp_dir)
-            with extra_note.path().open("w") as f:
-                f.write("\n")
+            extra_note.path().write_text("\n")
             extra_note.create()
             label1 = Label("test", tmp_dir)
             label1.create()
@@ -1095,6 +1219,15 @@ class TestPostProcessors(TestCase):
             )
             self.assertEqual([label2], name_result)
 
+            name_regex_result = list(
+                run_filters(
+                    tags, Namespace(
+                        time=None, name=["^t.s"], search=None, type=None
+                    )
+                )
+            )
+            self.assertEqual([label1], name_regex_result)
+
             # Month October or greater AND Day 11th or lower; OR Year is 2019
             date_range_result = list(
                 run_filters(
@@ -1121,29 +1254,26 @@ class TestPostProcessors(TestCase):
         self.assertEqual(True, parse_order("a"))
         self.assertEqual(False, parse_order("d"))
         self.assertEqual(None, parse_order("n"))
-        with self.assertRaises(TagError) as e:
-            parse_order("")
-        self.assertEqual(TagError.EXIT_BAD_ORDER, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            parse_order("zzz")
-        self.assertEqual(TagError.EXIT_BAD_ORDER, e.exception.exit_status)
+        for bad in ("", "zzz"):
+            with self.subTest(order=bad):
+                with self.assertRaises(TagError) as e:
+                    parse_order(bad)
+                self.assertEqual(
+                    TagError.EXIT_BAD_ORDER, e.exception.exit_status
+                )
 
     def test_parse_range(self):
-        with self.assertRaises(TagError) as e:
-            parse_range("      ")
-        self.assertEqual(TagError.EXIT_BAD_RANGE, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            parse_range("::::")
-        self.assertEqual(TagError.EXIT_BAD_RANGE, e.exception.exit_status)
-
-        with self.assertRaises(TagError) as e:
-            parse_range("foo:bar")
-        self.assertEqual(TagError.EXIT_BAD_RANGE, e.exception.exit_status)
+        for bad in ("      ", "::::", "foo:bar"):
+            with self.subTest(range=bad):
+                with self.assertRaises(TagError) as e:
+                    parse_range(bad)
+                self.assertEqual(
+                    TagError.EXIT_BAD_RANGE, e.exception.exit_status
+                )
 
         r1 = parse_range("1")
         self.assertIsInstance(r1, slice)
+        self.assertIs(r1, parse_range("1"))
         self.assertEqual(1, r1.start)
         self.assertEqual(2, r1.stop)
         self.assertEqual(None, r1.step)
@@ -1179,61 +1309,54 @@ class TestPostProcessors(TestCase):
         self.assertEqual(None, r6.step)
 
     def test_run_order_range(self):
-        with TemporaryDirectory() as tmp_dir:
-            tmp_dir = Path(tmp_dir)
+        with tmp_path() as tmp_dir:
             tags = []
             # 2018-01-01_05-06-07.txt, something, 2017-05-05_05-05-05.txt,
             # 2019-02-02_01-02-03.txt
             first = Note("2018-01-01_05-06-07.txt", tmp_dir)
-            with first.path().open("w") as f:
-                f.write("")
+            _touch(first.path())
             first.create()
             second = Label("something", tmp_dir)
             second.create()
             third = Note("2017-05-05_05-05-05.txt", tmp_dir)
-            with third.path().open("w") as f:
-                f.write("")
+            _touch(third.path())
             third.create()
             fourth = Note("2019-02-02_01-02-03.txt", tmp_dir)
-            with fourth.path().open("w") as f:
-                f.write("")
+            _touch(fourth.path())
             fourth.create()
             tags.append(first)
             tags.append(second)
             tags.append(third)
             tags.append(fourth)
 
-            null_result = list(
-                run_order_range(tags, Namespace(order=None, range=None))
+            self.assertIterEqual(
+                tags, run_order_range(tags, Namespace(order=None, range=None))
             )
-            self.assertEqual(tags, null_result)
 
-            ascending_result = list(
+            self.assertIterEqual(
+                [third, first, fourth, second],
                 run_order_range(tags, Namespace(order="asc", range=None), None)
             )
-            self.assertEqual([third, first, fourth, second], ascending_result)
 
-            descending_result = list(
-                run_order_range(tags, Namespace(order="desc", range=None), None)
-            )
-            self.assertEqual([second, fourth, first, third], descending_result)
-
-            range_result = list(
+            self.assertIterEqual(
+                [second, fourth, first, third],
                 run_order_range(
-                    tags, Namespace(order="none", range="2:3")
+                    tags, Namespace(order="desc", range=None), None
                 )
             )
-            self.assertEqual([third], range_result)
 
-            open_range_result = list(
-                run_order_range(
-                    tags, Namespace(order="none", range="3:")
-                )
+            self.assertIterEqual(
+                [third],
+                run_order_range(tags, Namespace(order="none", range="2:3"))
+            )
+
+            self.assertIterEqual(
+                [fourth],
+                run_order_range(tags, Namespace(order="none", range="3:"))
             )
-            self.assertEqual([fourth], open_range_result)
 
     def test_read_config_file(self):
-        with TemporaryDirectory() as tmp_dir:
+        with tmp_path() as tmp_dir:
             with open(str(Path(tmp_dir, "config.txt")), "w") as f:
                 f.write('{{"notes_directory": "{}"}}'.format(str(tmp_dir)))
             config = read_config_file(Path(tmp_dir, "config.txt"))